@@ -0,0 +1,141 @@
+import json
+import math
+import queue
+import time
+import scenario_engine
+
+# --- CONFIGURATION ---
+CONTROL_TOPIC = "nebula/control"
+
+# Bed attributes a command is allowed to drive
+VITALS = ("hr", "pulse", "rr", "spo2", "temp", "bp_sys", "bp_dia", "fluid")
+
+# Allowed range per attribute: the model's own bounds, so pinned values stay
+# inside what the simulator (and the God Mode sliders) can represent
+LIMITS = {v: (float(lo), float(hi)) for v, lo, hi in
+          zip(scenario_engine.VITALS, scenario_engine.LOWER, scenario_engine.UPPER)}
+LIMITS["pulse"] = (scenario_engine.PULSE_LOWER, scenario_engine.PULSE_UPPER)
+LIMITS["fluid"] = (0.0, 100.0)
+ACTIONS = ("set", "ramp", "nurse_call", "release")
+
+# --- COMMAND BUILDING ---
+def make_command(action, beds=None, bed_range=None, ward=None, vitals=None, duration=0, on=True):
+    """Builds a scenario command for a set of beds.
+
+    Targets are any mix of explicit bed ids, an inclusive bed-number range
+    and a ward name; a bed must match every target that is given.
+    """
+    if action not in ACTIONS:
+        raise ValueError(f"Unknown action: {action}")
+    return {
+        "action": action,
+        "beds": list(beds) if beds else None,
+        "range": list(bed_range) if bed_range else None,
+        "ward": ward,
+        "vitals": {k: v for k, v in (vitals or {}).items() if k in VITALS},
+        "duration": duration,
+        "on": on,
+        "issued": time.time(),
+    }
+
+def publish_command(client, command):
+    """Sends a command to every simulator listening on the control topic."""
+    return client.publish(CONTROL_TOPIC, json.dumps(command), qos=1)
+
+def on_connect(client, userdata, flags, reason_code, properties=None):
+    """(Re)subscribes to the control topic each time paho (re)connects."""
+    client.subscribe(CONTROL_TOPIC, qos=1)
+
+def to_number(value, default=None):
+    """float(value) if it is a finite number, else `default`."""
+    try: number = float(value)
+    except (TypeError, ValueError): return default
+    return number if math.isfinite(number) else default
+
+def bed_number(bed_id):
+    """'BED-042' -> 42"""
+    try: return int(bed_id.rsplit("-", 1)[1])
+    except (IndexError, ValueError): return None
+
+# --- COMMAND APPLIER (runs inside each simulator) ---
+class CommandApplier:
+    """Applies control-topic commands to the beds one simulator owns.
+
+    MQTT callbacks only queue the raw command; `apply()` is called from the
+    publish loop after the beds drift, so overrides always win for that tick.
+    """
+
+    def __init__(self, ward):
+        self.ward = ward
+        self.inbox = queue.Queue()
+        self.overrides = {}  # bed_id -> {attr: (start, target, t0, duration)}
+
+    def on_message(self, client, userdata, msg):
+        try: self.inbox.put(json.loads(msg.payload.decode()))
+        except Exception as e: print(f"Bad Control Command: {e}")
+
+    def matches(self, command, bed_id):
+        if command.get("ward") and command["ward"] != self.ward:
+            return False
+        if command.get("beds") and bed_id not in command["beds"]:
+            return False
+        if command.get("range"):
+            num = bed_number(bed_id)
+            first, last = command["range"]
+            if num is None or not first <= num <= last:
+                return False
+        return True
+
+    def handle(self, command, beds, now):
+        action = command.get("action")
+        targets = [b for bid, b in beds.items() if self.matches(command, bid)]
+
+        # The control topic is on a public broker: keep only numeric values we know,
+        # clamped to the range the simulator can represent
+        vitals = {}
+        for attr, target in (command.get("vitals") or {}).items():
+            target = to_number(target)
+            if attr in VITALS and target is not None:
+                lo, hi = LIMITS[attr]
+                vitals[attr] = min(max(target, lo), hi)
+        duration = to_number(command.get("duration", 0), 0.0) if action == "ramp" else 0.0
+
+        on = command.get("on", True)
+        if action == "nurse_call" and not isinstance(on, bool):
+            raise ValueError(f"nurse_call 'on' must be true or false, got {on!r}")
+
+        for bed in targets:
+            if action in ("set", "ramp"):
+                ramps = self.overrides.setdefault(bed.bed_id, {})
+                for attr, target in vitals.items():
+                    ramps[attr] = (getattr(bed, attr), target, now, duration)
+            elif action == "nurse_call":
+                bed.nurse_call = on
+            elif action == "release":
+                self.overrides.pop(bed.bed_id, None)
+
+        return len(targets)
+
+    def apply(self, beds, now=None):
+        """Drains pending commands, then pins every overridden vital."""
+        now = time.time() if now is None else now
+        while not self.inbox.empty():
+            command = self.inbox.get_nowait()
+            try:
+                count = self.handle(command, beds, now)
+                if count: print(f"🎬 {command.get('action')} -> {count} beds")
+            except Exception as e:
+                print(f"Control Command Error: {e}")
+
+        for bed_id, ramps in list(self.overrides.items()):
+            bed = beds.get(bed_id)
+            if bed is None:
+                continue
+            try:
+                for attr, (start, target, t0, duration) in ramps.items():
+                    progress = 1.0 if duration <= 0 else min(1.0, (now - t0) / duration)
+                    setattr(bed, attr, start + (target - start) * progress)
+            except Exception as e:
+                # A bad override must not stop the publish loop; drop it instead
+                print(f"Control Override Error ({bed_id}): {e}")
+                self.overrides.pop(bed_id, None)
@@ -1,11 +1,14 @@
 import streamlit as st
 import paho.mqtt.client as mqtt
 import json
+import math
 import time
 import queue
 import pandas as pd
-from patient_db import generate_patient_db
+from patient_db import WARD_SEED, generate_patient_db
 from ehr_manager import EHRManager
+from metrics import METRICS, PROFILER, start_metrics_server
+from heartbeat import HeartbeatTracker
 
 # --- PAGE CONFIG ---
 st.set_page_config(page_title="Project Nebula", layout="wide", page_icon="🏥")
@@ -13,13 +16,28 @@ st.title("🏥 PROJECT NEBULA: 5G SMART WARD")
 
 # --- INIT GLOBAL STATE ---
 if "patient_db" not in st.session_state:
-    st.session_state.patient_db = generate_patient_db(50)
+    st.session_state.patient_db = generate_patient_db(50, seed=WARD_SEED)
+
+# One EHRManager per server so every viewer shares its read pool and cache
+@st.cache_resource
+def get_ehr(): return EHRManager()
 
 if "ehr" not in st.session_state:
-    st.session_state.ehr = EHRManager()
+    st.session_state.ehr = get_ehr()
+
+# Live bed state and heartbeats are per server too: every session drains the
+# same MQTT mailbox, so each one only sees part of the traffic
+@st.cache_resource
+def get_live_beds(): return {}
+
+@st.cache_resource
+def get_heartbeat(): return HeartbeatTracker(now=time.time())
 
 if "beds" not in st.session_state: 
-    st.session_state.beds = {}
+    st.session_state.beds = get_live_beds()
+
+if "heartbeat" not in st.session_state:
+    st.session_state.heartbeat = get_heartbeat()
 
 if "selected_patient" not in st.session_state:
     st.session_state.selected_patient = None
@@ -59,9 +77,19 @@ def calculate_news(hr, pulse, spo2, sys_bp, temp, rr):
 def get_mailbox(): return queue.Queue()
 mailbox = get_mailbox()
 
+@st.cache_resource
+def start_metrics():
+    METRICS.gauge_fn("nebula_queue_depth", mailbox.qsize)
+    return start_metrics_server()
+
+start_metrics()
+
 def on_message(client, userdata, msg):
-    try: mailbox.put(msg.payload.decode())
-    except: pass
+    try:
+        mailbox.put(msg.payload.decode())
+        METRICS.inc("nebula_messages_received_total")
+    except Exception:
+        METRICS.inc("nebula_messages_dropped_total")
 
 @st.cache_resource
 def start_mqtt():
@@ -80,40 +108,65 @@ client = start_mqtt()
 def process_and_save_data():
     """Reads MQTT queue, updates State, and Saves to EHR DB."""
     now = time.time()
-    while not mailbox.empty():
-        try:
-            payload = mailbox.get_nowait()
-            data = json.loads(payload)
-            
-            bid = data.get('id', 'Unknown')
-            hr = int(data.get('hr', 0))
-            pulse = int(data.get('pulse', hr)) 
-            spo2 = int(data.get('spo2', 98))
-            temp = float(data.get('temp', 37.0))
-            rr = int(data.get('rr', 16))
-            bp_str = data.get('bp', "120/80")
-            try: sys_bp = int(bp_str.split('/')[0])
-            except: sys_bp = 120
-
-            score = calculate_news(hr, pulse, spo2, sys_bp, temp, rr)
-            color, label = get_risk_level(score)
-
-            # SAVE TO EHR
-            st.session_state.ehr.log_vitals(bid, hr, spo2, bp_str, temp, score, label)
-
-            # UPDATE LIVE STATE
-            st.session_state.beds[bid] = {
-                **data, "news": score, "color": color, "label": label, "last": now
-            }
-        except Exception:
-            continue
+    with PROFILER.sample():
+        while not mailbox.empty():
+            try: payload = mailbox.get_nowait()
+            except queue.Empty: break
+
+            # 1. DECODE (malformed JSON or vitals that don't convert)
+            try:
+                with METRICS.timer("nebula_decode_seconds"):
+                    data = json.loads(payload)
+                
+                bid = data.get('id', 'Unknown')
+                hr = int(data.get('hr', 0))
+                pulse = int(data.get('pulse', hr)) 
+                spo2 = int(data.get('spo2', 98))
+                temp = float(data.get('temp', 37.0))
+                if not math.isfinite(temp): raise ValueError(f"temp {temp}")
+                rr = int(data.get('rr', 16))
+                bp_str = data.get('bp', "120/80")
+                try: sys_bp = int(bp_str.split('/')[0])
+                except: sys_bp = 120
+            except (ValueError, TypeError, AttributeError, OverflowError):
+                # OverflowError: json.loads accepts Infinity / 1e400, which int() rejects
+                METRICS.inc("nebula_parse_errors_total")
+                continue
+
+            # 2. SCORE, SAVE & UPDATE
+            try:
+                with METRICS.timer("nebula_score_seconds"):
+                    score = calculate_news(hr, pulse, spo2, sys_bp, temp, rr)
+                    color, label = get_risk_level(score)
+
+                # SAVE TO EHR
+                st.session_state.ehr.log_vitals(bid, hr, spo2, bp_str, temp, score, label)
+
+                # UPDATE LIVE STATE
+                st.session_state.beds[bid] = {
+                    **data, "news": score, "color": color, "label": label, "last": now
+                }
+                gap = st.session_state.heartbeat.beat(bid, now)
+                if gap:
+                    st.session_state.ehr.log_online(*gap)
+                METRICS.inc("nebula_messages_processed_total")
+                METRICS.mark("nebula_messages_per_second", now)
+            except Exception:
+                METRICS.inc("nebula_processing_errors_total")
+                continue
+
+    # Only beds whose deadline expired this tick are touched
+    went_offline, dropped = st.session_state.heartbeat.advance(now)
+    for bid, since in went_offline:
+        st.session_state.ehr.log_offline(bid, since)
+    for bid in dropped:
+        st.session_state.beds.pop(bid, None)
 
 # --- SIDEBAR ALERTS (GLOBAL) ---
 process_and_save_data() # Quick update on load
 now = time.time()
-# Filter Active Beds (Seen in last 60s)
-active_beds = [b for k,b in st.session_state.beds.items() if (now - b['last'] < 60)]
-sorted_beds = sorted(active_beds, key=lambda x: x['id'])
+# Beds silent for 60s have already been dropped by the heartbeat tracker
+sorted_beds = sorted(st.session_state.beds.values(), key=lambda x: x['id'])
 critical_beds = [b for b in sorted_beds if b['news'] >= 7 or b.get('status') == "CRITICAL"]
 
 page = st.sidebar.radio("Navigation", ["🟢 Live Monitor", "📂 Patient Database"])
@@ -167,16 +220,19 @@ if page == "📂 Patient Database":
             
             st.write("") 
 
-            history_df = st.session_state.ehr.get_patient_history(selected_bed)
+            history = st.session_state.ehr.get_patient_history(selected_bed)
             
-            if not history_df.empty:
+            if history['timestamp']:
                 st.subheader("📈 Clinical Vitals Trends")
-                history_df['timestamp'] = pd.to_datetime(history_df['timestamp'])
-                chart_data = history_df[['timestamp', 'hr', 'spo2']].set_index('timestamp')
-                st.line_chart(chart_data, color=["#FF0000", "#00FFFF"]) 
+                chart_data = {
+                    "timestamp": pd.to_datetime(history['timestamp']),
+                    "hr": history['hr'],
+                    "spo2": history['spo2'],
+                }
+                st.line_chart(chart_data, x="timestamp", y=["hr", "spo2"], color=["#FF0000", "#00FFFF"]) 
                 
                 with st.expander("View Raw Data Logs"):
-                    st.dataframe(history_df.sort_values(by='timestamp', ascending=False), use_container_width=True)
+                    st.dataframe({col: values[::-1] for col, values in history.items()}, use_container_width=True)
             else:
                 st.info("No live telemetry recorded yet. Please wait for incoming data...")
         else:
@@ -225,19 +281,13 @@ elif page == "🟢 Live Monitor":
         # 1. PROCESS DATA
         process_and_save_data()
         
-        # 2. RECALCULATE LIST & FIX KEYERROR
+        # 2. RECALCULATE LIST (offline/dropped flags come from the heartbeat tracker)
         now = time.time()
-        active_beds_list = [b for k,b in st.session_state.beds.items() if (now - b['last'] < 60)]
-        
-        # *** FIX IS HERE: ADD 'is_offline' BEFORE SORTING ***
-        for b in active_beds_list:
-            b['age'] = int(now - b['last'])
-            b['is_offline'] = b['age'] > 10
-            
-        sorted_beds = sorted(active_beds_list, key=lambda x: x['id'])
+        sorted_beds = sorted(st.session_state.beds.values(), key=lambda x: x['id'])
         critical_count = len([b for b in sorted_beds if b['news'] >= 7 or b.get('status') == "CRITICAL"])
 
         # 3. RENDER METRICS
+        render_start = time.perf_counter()
         with metrics_placeholder.container():
             c1, c2, c3 = st.columns(3)
             c1.metric("Connected Beds", len(sorted_beds))
@@ -253,8 +303,8 @@ elif page == "🟢 Live Monitor":
             cols = st.columns(4)
             for i, b in enumerate(sorted_beds):
                 with cols[i % 4]:
-                    # Safer check for is_offline using .get() just in case
-                    is_offline = b.get('is_offline', False)
+                    # The heartbeat tracker is the single source of truth for offline beds
+                    is_offline = st.session_state.heartbeat.is_offline(b['id'])
                     border_color = b['color'] if not is_offline else "#444"
                     opacity = "1.0" if not is_offline else "0.5"
                     fluid = int(b.get('fluid', 0))
@@ -279,10 +329,11 @@ elif page == "🟢 Live Monitor":
                 <span style="color:#00bcd4;">💧 Saline: <b>{fluid}%</b></span>
         </div>
         <div style="margin-top:5px; font-size:0.7em; color:#ccc; text-align:right;">
-            🕒 Updated: {b.get('age', 0)}s ago
+            🕒 Updated: {int(now - b['last'])}s ago
         </div>
     </div>
     """, unsafe_allow_html=True)
                     st.progress(fluid/100)
 
+        METRICS.observe("nebula_render_seconds", time.perf_counter() - render_start)
         time.sleep(1)
\ No newline at end of file
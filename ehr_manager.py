@@ -1,18 +1,41 @@
 import sqlite3
-import pandas as pd
+import queue
+import threading
+from collections import OrderedDict
+from contextlib import contextmanager
 from datetime import datetime
+from pathlib import Path
 import os
+from metrics import METRICS
+
+# Columns returned by get_patient_history, oldest reading first
+HISTORY_COLUMNS = ("timestamp", "hr", "spo2", "bp", "temp", "news_score", "status")
 
 class EHRManager:
-    def __init__(self, db_path="nebula_records.db"):
+    def __init__(self, db_path="nebula_records.db", pool_size=4, cache_size=256):
         self.db_path = db_path
         self._init_db()
 
+        # Read side: a small pool of read-only connections shared by all viewers
+        self._pool = queue.Queue()
+        self._pool_size = pool_size
+        self._pool_opened = 0
+        self._pool_lock = threading.Lock()
+
+        # LRU of (bed_id, limit) -> (generation, history); an insert bumps the bed's generation
+        self._cache = OrderedDict()
+        self._cache_size = cache_size
+        self._generation = {}
+        self._cache_lock = threading.Lock()
+
     def _init_db(self):
         """Creates the database and table if they don't exist."""
         # Check if DB exists, if not, it will be created
         conn = sqlite3.connect(self.db_path, check_same_thread=False)
         cursor = conn.cursor()
+
+        # WAL lets readers run alongside the writer (the mode is stored in the file)
+        cursor.execute("PRAGMA journal_mode=WAL")
         
         # Create the table for storing vitals
         cursor.execute('''
@@ -33,33 +56,130 @@ class EHRManager:
         cursor.execute('''
             CREATE INDEX IF NOT EXISTS idx_bed_id ON vitals_log (bed_id);
         ''')
+
+        # Create the table for 5G link gaps (came_online is NULL while the bed is still offline)
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS connectivity_log (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                bed_id TEXT,
+                went_offline DATETIME,
+                came_online DATETIME,
+                gap_seconds REAL
+            )
+        ''')
+        cursor.execute('''
+            CREATE INDEX IF NOT EXISTS idx_conn_bed_id ON connectivity_log (bed_id);
+        ''')
         
         conn.commit()
         conn.close()
 
     def log_vitals(self, bed_id, hr, spo2, bp, temp, score, status):
         """Saves a new reading to the database."""
+        try:
+            with METRICS.timer("nebula_db_insert_seconds"):
+                conn = sqlite3.connect(self.db_path, check_same_thread=False)
+                cursor = conn.cursor()
+                cursor.execute('''
+                    INSERT INTO vitals_log (bed_id, timestamp, hr, spo2, bp, temp, news_score, status)
+                    VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+                ''', (bed_id, datetime.now(), hr, spo2, bp, temp, score, status))
+                conn.commit()
+                conn.close()
+            with self._cache_lock:
+                self._generation[bed_id] = self._generation.get(bed_id, 0) + 1
+        except Exception as e:
+            METRICS.inc("nebula_db_insert_errors_total")
+            print(f"EHR Save Error: {e}")
+
+    def log_offline(self, bed_id, since):
+        """Opens a gap for a bed that stopped sending heartbeats at `since` (epoch seconds)."""
         try:
             conn = sqlite3.connect(self.db_path, check_same_thread=False)
             cursor = conn.cursor()
             cursor.execute('''
-                INSERT INTO vitals_log (bed_id, timestamp, hr, spo2, bp, temp, news_score, status)
-                VALUES (?, ?, ?, ?, ?, ?, ?, ?)
-            ''', (bed_id, datetime.now(), hr, spo2, bp, temp, score, status))
+                INSERT INTO connectivity_log (bed_id, went_offline)
+                VALUES (?, ?)
+            ''', (bed_id, datetime.fromtimestamp(since)))
             conn.commit()
             conn.close()
         except Exception as e:
-            print(f"EHR Save Error: {e}")
+            METRICS.inc("nebula_db_insert_errors_total")
+            print(f"EHR Gap Save Error: {e}")
 
-    def get_patient_history(self, bed_id):
-        """Retrieves all recorded vitals for a specific bed."""
+    def log_online(self, bed_id, since, until):
+        """Closes the open gap for a bed that came back at `until` (epoch seconds)."""
         try:
             conn = sqlite3.connect(self.db_path, check_same_thread=False)
-            # Get the last 50 records so the graph doesn't get too crowded
-            query = "SELECT * FROM vitals_log WHERE bed_id = ? ORDER BY timestamp DESC LIMIT 50"
-            df = pd.read_sql_query(query, conn, params=(bed_id,))
+            cursor = conn.cursor()
+            cursor.execute('''
+                UPDATE connectivity_log SET came_online = ?, gap_seconds = ?
+                WHERE id = (SELECT MAX(id) FROM connectivity_log WHERE bed_id = ? AND came_online IS NULL)
+            ''', (datetime.fromtimestamp(until), until - since, bed_id))
+            if cursor.rowcount == 0:
+                # Gap opened before this session started; record it whole
+                cursor.execute('''
+                    INSERT INTO connectivity_log (bed_id, went_offline, came_online, gap_seconds)
+                    VALUES (?, ?, ?, ?)
+                ''', (bed_id, datetime.fromtimestamp(since), datetime.fromtimestamp(until), until - since))
+            conn.commit()
             conn.close()
-            return df
         except Exception as e:
+            METRICS.inc("nebula_db_insert_errors_total")
+            print(f"EHR Gap Save Error: {e}")
+
+    @contextmanager
+    def _reader(self):
+        """Borrows a read-only connection, opening one only while the pool is below its size."""
+        try:
+            conn = self._pool.get_nowait()
+        except queue.Empty:
+            with self._pool_lock:
+                can_open = self._pool_opened < self._pool_size
+                if can_open: self._pool_opened += 1
+            if can_open:
+                uri = Path(self.db_path).absolute().as_uri() + "?mode=ro"
+                conn = sqlite3.connect(uri, uri=True, check_same_thread=False)
+            else:
+                conn = self._pool.get()
+
+        try:
+            yield conn
+        except Exception:
+            # Don't hand a possibly broken connection to the next viewer
+            conn.close()
+            with self._pool_lock:
+                self._pool_opened -= 1
+            raise
+        self._pool.put(conn)
+
+    def get_patient_history(self, bed_id, limit=50):
+        """Retrieves the last `limit` vitals for a bed as {column: tuple}, oldest first."""
+        key = (bed_id, limit)
+        with self._cache_lock:
+            generation = self._generation.get(bed_id, 0)
+            cached = self._cache.get(key)
+            if cached and cached[0] == generation:
+                self._cache.move_to_end(key)
+                METRICS.inc("nebula_ehr_cache_hits_total")
+                return dict(cached[1])
+        METRICS.inc("nebula_ehr_cache_misses_total")
+
+        try:
+            with METRICS.timer("nebula_db_read_seconds"), self._reader() as conn:
+                # Newest rows via the bed_id index (rowid follows insert order), so no sort is needed
+                query = "SELECT timestamp, hr, spo2, bp, temp, news_score, status FROM vitals_log WHERE bed_id = ? ORDER BY id DESC LIMIT ?"
+                rows = conn.execute(query, (bed_id, limit)).fetchall()
+        except Exception as e:
+            METRICS.inc("nebula_db_read_errors_total")
             print(f"EHR Retrieval Error: {e}")
-            return pd.DataFrame()
\ No newline at end of file
+            return {c: () for c in HISTORY_COLUMNS}
+
+        columns = list(zip(*reversed(rows))) or [()] * len(HISTORY_COLUMNS)
+        history = dict(zip(HISTORY_COLUMNS, columns))
+        with self._cache_lock:
+            self._cache[key] = (generation, history)
+            self._cache.move_to_end(key)
+            while len(self._cache) > self._cache_size:
+                self._cache.popitem(last=False)
+        return dict(history)
\ No newline at end of file
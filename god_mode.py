@@ -2,134 +2,57 @@ import streamlit as st
 import paho.mqtt.client as mqtt
 import json
 import time
-import random
 import threading
+from control_channel import on_connect, LIMITS, VITALS, CommandApplier, make_command, publish_command
+from patient_db import WARD_SEED, generate_patient_db
+from scenario_engine import WardModel
 
 # --- CONFIGURATION ---
 BROKER = "broker.hivemq.com"
 PORT = 1883
-TOPIC_BASE = "nebula/ward1/bed"
+WARD = "ward1"
+TOPIC_BASE = f"nebula/{WARD}/bed"
 
 # --- 1. SHARED LOGIC ---
-class PatientBed:
-    def __init__(self, bed_id):
-        self.bed_id = bed_id
-        self.hr = random.randint(60, 90)
-        self.pulse = random.randint(58, 88)
-        self.rr = random.randint(12, 20)
-        self.spo2 = random.randint(96, 100)
-        self.fluid = random.randint(50, 100)
-        self.bp_sys = random.randint(110, 130)
-        self.bp_dia = random.randint(70, 85)
-        self.temp = random.uniform(36.5, 37.2)
-        
-        self.flow_rate = random.uniform(0.4, 0.7)
-        self.status = "NORMAL"
-        self.critical_timer = 0
-        self.manual_mode = False 
-        self.nurse_call = False 
-
-    def update(self):
-        self.fluid -= self.flow_rate
-        if self.fluid <= 0: self.fluid = 100 
-        
-        if self.manual_mode:
-            return self.package_data()
-
-        # --- AUTO DRIFT ---
-        self.hr += random.randint(-2, 2)
-        self.hr = max(45, min(190, self.hr))
-        
-        self.pulse = self.hr - random.randint(0, 2)
-        self.pulse = max(40, min(190, self.pulse))
-        
-        if random.random() < 0.2: 
-            self.rr += random.randint(-1, 1)
-        self.rr = max(8, min(40, self.rr))
-
-        if random.random() < 0.3: self.spo2 += random.randint(-1, 1)
-        self.spo2 = max(80, min(100, self.spo2))
-
-        if random.random() < 0.5:
-            self.bp_sys += random.randint(-2, 2)
-            self.bp_dia += random.randint(-1, 1)
-        self.bp_sys = max(90, min(180, self.bp_sys))
-        self.bp_dia = max(60, min(110, self.bp_dia))
-
-        if random.random() < 0.2: self.temp += random.uniform(-0.1, 0.1)
-        self.temp = max(33.0, min(40.0, self.temp))
-
-        # Critical Logic (UPDATED: 0.1% chance)
-        if self.status == "NORMAL" and not self.nurse_call and random.random() < 0.001:
-            self.status = "CRITICAL"
-            self.critical_timer = 15 
-            self.hr = random.randint(140, 170)
-            self.pulse = random.randint(135, 165)
-            self.rr = random.randint(28, 35) 
-            self.spo2 = random.randint(80, 88)
-            self.bp_sys = random.randint(70, 90)
-            self.bp_dia = random.randint(40, 60)
-        
-        if self.status == "CRITICAL" and not self.nurse_call:
-            self.critical_timer -= 1
-            if self.critical_timer <= 0:
-                self.status = "NORMAL"
-                self.hr = random.randint(70, 90)
-                self.pulse = self.hr - 2
-                self.rr = random.randint(12, 20)
-                self.spo2 = 98
-                self.bp_sys = 120
-                self.bp_dia = 80
-        
-        # --- FIX FOR NURSE CALL ---
-        # Explicitly overwrite status so ESP8266 detects it
-        if self.nurse_call:
-            self.status = "NURSE CALL"
-        elif self.status == "NURSE CALL" and not self.nurse_call:
-            self.status = "NORMAL"
-
-        return self.package_data()
-
-    def package_data(self):
-        return {
-            "id": self.bed_id,
-            "hr": int(self.hr),
-            "pulse": int(self.pulse),
-            "rr": int(self.rr),
-            "spo2": int(self.spo2),
-            "bp": f"{int(self.bp_sys)}/{int(self.bp_dia)}",
-            "temp": round(self.temp, 1),
-            "fluid": int(self.fluid),
-            "status": self.status,
-            "nurse_call": self.nurse_call,
-            "timestamp": time.time()
-        }
-
 @st.cache_resource
-def get_god_beds():
-    return [PatientBed(f"BED-{i:03d}") for i in range(2, 7)]
+def get_god_model():
+    patients = generate_patient_db(6, seed=WARD_SEED).iloc[1:]
+    return WardModel(patients['Bed ID'], patients['Condition'])
+
+god_model = get_god_model()
+god_beds = list(god_model.beds().values())
+
+def simulation_loop(client, applier):
+    beds = god_model.beds()
+    while True:
+        god_model.step()
+        applier.apply(beds)
+        for data in god_model.payloads():
+            topic = f"{TOPIC_BASE}/{data['id']}"
+            client.publish(topic, json.dumps(data))
+        time.sleep(1) 
 
-god_beds = get_god_beds()
+@st.cache_resource
+def start_simulation():
+    """One publisher per server process, shared by every open tab.
 
-def simulation_loop():
+    The same client also carries batch commands to the other simulators.
+    """
+    applier = CommandApplier(WARD)
     client = mqtt.Client(mqtt.CallbackAPIVersion.VERSION2, "Nebula_God_Mode")
+    client.on_message = applier.on_message
+    client.on_connect = on_connect   # Resubscribes after every reconnect
     try:
         client.connect(BROKER, PORT, 60)
         client.loop_start()
     except:
-        return
+        return None
 
-    while True:
-        for bed in god_beds:
-            data = bed.update() 
-            topic = f"{TOPIC_BASE}/{data['id']}"
-            client.publish(topic, json.dumps(data))
-        time.sleep(1) 
-
-if "sim_thread_started" not in st.session_state:
-    t = threading.Thread(target=simulation_loop, daemon=True)
+    t = threading.Thread(target=simulation_loop, args=(client, applier), daemon=True)
     t.start()
-    st.session_state.sim_thread_started = True
+    return client
+
+control_client = start_simulation()
 
 # --- STREAMLIT UI ---
 st.set_page_config(page_title="God Mode Controller", page_icon="⚡")
@@ -139,6 +62,7 @@ selected_bed_id = st.sidebar.selectbox("Select Target Bed", [b.bed_id for b in g
 current_bed = next(b for b in god_beds if b.bed_id == selected_bed_id)
 
 st.header(f"Controlling: {current_bed.bed_id}")
+st.caption(f"Scenario: {current_bed.condition}")
 
 col_main1, col_main2 = st.columns([1, 2])
 with col_main1:
@@ -190,6 +114,37 @@ st.markdown("---")
 st.caption("💧 Saline level is always auto-draining.")
 st.progress(int(current_bed.fluid))
 
+# --- BATCH SCENARIO COMMANDS ---
+st.markdown("---")
+st.header("🎬 Batch Scenario (Any Beds)")
+
+b1, b2, b3 = st.columns(3)
+first_bed = b1.number_input("From Bed #", 1, 100000, 10, key="batch_first")
+last_bed = b2.number_input("To Bed #", 1, 100000, 200, key="batch_last")
+target_ward = b3.text_input("Ward", WARD, key="batch_ward")
+
+action = st.selectbox("Action", ["ramp", "set", "nurse_call", "release"], key="batch_action")
+vitals, duration, alarm_on = {}, 0, True
+if action in ("ramp", "set"):
+    v1, v2, v3 = st.columns(3)
+    vital = v1.selectbox("Vital", VITALS, index=VITALS.index("spo2"), key="batch_vital")
+    lo, hi = LIMITS[vital]
+    vitals = {vital: v2.number_input("Target Value", min_value=lo, max_value=hi,
+                                     value=min(max(85.0, lo), hi), key=f"batch_value_{vital}")}
+    if action == "ramp":
+        duration = v3.number_input("Over (seconds)", 0, 3600, 30, key="batch_duration")
+elif action == "nurse_call":
+    alarm_on = st.checkbox("Alarm On", value=True, key="batch_alarm")
+
+if st.button("🚀 Send Command"):
+    if control_client is None:
+        st.error("Not connected to the broker.")
+    else:
+        command = make_command(action, bed_range=(first_bed, last_bed), ward=target_ward or None,
+                               vitals=vitals, duration=duration, on=alarm_on)
+        publish_command(control_client, command)
+        st.success(f"Sent {action} to beds {first_bed}-{last_bed} on {target_ward or 'all wards'}.")
+
 if not is_manual:
     time.sleep(1)
     st.rerun()
\ No newline at end of file
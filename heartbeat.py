@@ -0,0 +1,91 @@
+import math
+import threading
+
+# --- CONFIGURATION ---
+OFFLINE_AFTER = 10   # Seconds of silence before a bed is shown as offline
+DROP_AFTER = 60      # Seconds of silence before a bed leaves the live grid
+RESOLUTION = 1.0     # Seconds per wheel slot
+
+ONLINE, OFFLINE = "online", "offline"
+
+# --- HEARTBEAT TRACKER ---
+class HeartbeatTracker:
+    """Tracks bed heartbeats on a hashed timer wheel.
+
+    Every bed lives in exactly one slot (the tick of its next deadline), so a
+    heartbeat just moves it between slots and `advance()` only visits the
+    slots that have elapsed. Nothing is scanned for beds that are still fresh.
+    Safe to share between Streamlit sessions.
+    """
+
+    def __init__(self, offline_after=OFFLINE_AFTER, drop_after=DROP_AFTER, resolution=RESOLUTION, now=0.0):
+        self.offline_after = offline_after
+        self.drop_after = drop_after
+        self.resolution = resolution
+        self.size = int(math.ceil(drop_after / resolution)) + 1
+        self.wheel = [set() for _ in range(self.size)]
+        self.tick = int(now // resolution)
+        self._lock = threading.Lock()
+
+        self.last_seen = {}      # bed_id -> last heartbeat time
+        self.state = {}          # bed_id -> ONLINE / OFFLINE
+        self.offline_since = {}  # bed_id -> time of the last heartbeat before the gap
+        self._deadline = {}      # bed_id -> tick the bed is filed under
+
+    def _schedule(self, bed_id, deadline):
+        self._unschedule(bed_id)
+        # Sessions share the tracker, so a caller's `now` can lag the wheel; never file into a passed slot
+        tick = max(int(math.ceil(deadline / self.resolution)), self.tick + 1)
+        self._deadline[bed_id] = tick
+        self.wheel[tick % self.size].add(bed_id)
+
+    def _unschedule(self, bed_id):
+        tick = self._deadline.pop(bed_id, None)
+        if tick is not None:
+            self.wheel[tick % self.size].discard(bed_id)
+
+    def beat(self, bed_id, now):
+        """Records a heartbeat. Returns (bed_id, gap_start, gap_end) if the bed was offline."""
+        with self._lock:
+            gap = None
+            if self.state.get(bed_id) == OFFLINE:
+                gap = (bed_id, self.offline_since.pop(bed_id), now)
+
+            self.last_seen[bed_id] = now
+            self.state[bed_id] = ONLINE
+            self._schedule(bed_id, now + self.offline_after)
+            return gap
+
+    def advance(self, now):
+        """Fires expired deadlines up to `now`.
+
+        Returns two lists: beds that just went offline as (bed_id, since)
+        pairs, and bed_ids that have been silent for `drop_after` seconds.
+        """
+        with self._lock:
+            went_offline, dropped = [], []
+            target = int(now // self.resolution)
+            # After a long stall every slot has expired once; no need to lap the wheel.
+            first = max(self.tick + 1, target - self.size + 1)
+
+            for tick in range(first, target + 1):
+                slot = self.wheel[tick % self.size]
+                for bed_id in [b for b in slot if self._deadline[b] <= target]:
+                    self._unschedule(bed_id)
+                    last = self.last_seen[bed_id]
+                    if self.state[bed_id] == ONLINE:
+                        self.state[bed_id] = OFFLINE
+                        self.offline_since[bed_id] = last
+                        went_offline.append((bed_id, last))
+                        if last + self.drop_after > target * self.resolution:
+                            self._schedule(bed_id, last + self.drop_after)
+                            continue
+                    # Dropped beds stay OFFLINE so their next heartbeat closes the gap
+                    dropped.append(bed_id)
+
+            self.tick = max(self.tick, target)
+            return went_offline, dropped
+
+    def is_offline(self, bed_id):
+        """O(1) lookup used by the grid; transitions only happen in beat()/advance()."""
+        return self.state.get(bed_id) == OFFLINE
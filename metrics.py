@@ -0,0 +1,205 @@
+import threading
+import time
+import io
+import cProfile
+import pstats
+import tracemalloc
+from collections import deque
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# --- CONFIGURATION ---
+METRICS_HOST = "127.0.0.1"
+METRICS_PORT = 9108
+RATE_WINDOW = 10        # Seconds used for the messages/sec gauge
+SAMPLE_SIZE = 1024      # Recent timings kept per stage for quantiles
+QUANTILES = (0.5, 0.9, 0.99)
+
+# --- COUNTERS, GAUGES & STAGE TIMERS ---
+class Metrics:
+    """Thread-safe counters, gauges and stage timers for the ward pipeline."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._counters = {}
+        self._gauge_fns = {}
+        self._timings = {}   # name -> (recent samples, total count, total seconds)
+        self._events = {}    # name -> timestamps inside RATE_WINDOW
+
+    def inc(self, name, amount=1):
+        with self._lock:
+            self._counters[name] = self._counters.get(name, 0) + amount
+
+    def gauge_fn(self, name, fn):
+        """Registers a callable that is read every time the endpoint is scraped."""
+        with self._lock:
+            self._gauge_fns[name] = fn
+
+    def observe(self, name, seconds):
+        with self._lock:
+            samples, count, total = self._timings.get(name, (deque(maxlen=SAMPLE_SIZE), 0, 0.0))
+            samples.append(seconds)
+            self._timings[name] = (samples, count + 1, total + seconds)
+
+    @contextmanager
+    def timer(self, name):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(name, time.perf_counter() - start)
+
+    def mark(self, name, now=None):
+        """Records one event for a per-second rate gauge."""
+        now = time.time() if now is None else now
+        with self._lock:
+            events = self._events.setdefault(name, deque())
+            events.append(now)
+            while events and now - events[0] > RATE_WINDOW:
+                events.popleft()
+
+    def render_prometheus(self):
+        """Returns every metric in the Prometheus text exposition format."""
+        now = time.time()
+        lines = []
+        with self._lock:
+            counters = dict(self._counters)
+            gauges = {}
+            gauge_fns = dict(self._gauge_fns)
+            timings = {k: (sorted(s), c, t) for k, (s, c, t) in self._timings.items()}
+            for name, events in self._events.items():
+                while events and now - events[0] > RATE_WINDOW:
+                    events.popleft()
+                gauges[name] = len(events) / RATE_WINDOW
+
+        for name, fn in gauge_fns.items():
+            try: gauges[name] = fn()
+            except Exception: continue
+
+        for name, value in sorted(counters.items()):
+            lines.append(f"# TYPE {name} counter")
+            lines.append(f"{name} {value}")
+
+        for name, value in sorted(gauges.items()):
+            lines.append(f"# TYPE {name} gauge")
+            lines.append(f"{name} {value}")
+
+        for name, (samples, count, total) in sorted(timings.items()):
+            lines.append(f"# TYPE {name} summary")
+            for q in QUANTILES:
+                idx = min(len(samples) - 1, int(q * len(samples)))
+                lines.append(f'{name}{{quantile="{q}"}} {samples[idx]:.6f}')
+            lines.append(f"{name}_sum {total:.6f}")
+            lines.append(f"{name}_count {count}")
+
+        return "\n".join(lines) + "\n"
+
+# --- RUNTIME PROFILING ---
+class Profiler:
+    """cProfile / tracemalloc sampling that can be switched on while running.
+
+    The HTTP handler only raises a flag; the processing loop profiles itself
+    inside `sample()`. A Profile can't be shared between threads (3.12+ also
+    allows one active profiler per process), so only one session thread
+    samples at a time and the others simply run unprofiled.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._sampling = threading.Lock()
+        self._cpu_wanted = False
+        self._cpu = cProfile.Profile()
+        self._cpu_samples = 0
+
+    def start_cpu(self):
+        with self._lock:
+            self._cpu_wanted = True
+            self._cpu = cProfile.Profile()
+            self._cpu_samples = 0
+
+    def stop_cpu(self, limit=25):
+        """Stops CPU sampling and returns the top functions by cumulative time."""
+        # Waits for an in-flight sample so its profile is disabled before reading it
+        with self._sampling, self._lock:
+            self._cpu_wanted = False
+            if self._cpu_samples == 0:
+                return "No CPU samples collected.\n"
+            out = io.StringIO()
+            pstats.Stats(self._cpu, stream=out).sort_stats("cumulative").print_stats(limit)
+            return out.getvalue()
+
+    @contextmanager
+    def sample(self):
+        if not self._cpu_wanted or not self._sampling.acquire(blocking=False):
+            yield
+            return
+        try:
+            with self._lock:
+                profile = self._cpu
+            try:
+                profile.enable()
+            except ValueError:
+                # Another profiler is already active in this process
+                yield
+                return
+            with self._lock:
+                self._cpu_samples += 1
+            try:
+                yield
+            finally:
+                profile.disable()
+        finally:
+            self._sampling.release()
+
+    def start_memory(self):
+        if not tracemalloc.is_tracing():
+            tracemalloc.start()
+
+    def stop_memory(self, limit=25):
+        """Stops tracemalloc and returns the biggest allocation sites."""
+        if not tracemalloc.is_tracing():
+            return "tracemalloc is not running.\n"
+        snapshot = tracemalloc.take_snapshot()
+        tracemalloc.stop()
+        stats = snapshot.statistics("lineno")[:limit]
+        return "".join(f"{stat}\n" for stat in stats)
+
+# --- SHARED INSTANCES ---
+METRICS = Metrics()
+PROFILER = Profiler()
+
+# --- HTTP ENDPOINT ---
+class _MetricsHandler(BaseHTTPRequestHandler):
+    routes = {
+        "/metrics": lambda: METRICS.render_prometheus(),
+        "/profile/cpu/start": lambda: (PROFILER.start_cpu(), "CPU profiling started.\n")[1],
+        "/profile/cpu/stop": lambda: PROFILER.stop_cpu(),
+        "/profile/memory/start": lambda: (PROFILER.start_memory(), "tracemalloc started.\n")[1],
+        "/profile/memory/stop": lambda: PROFILER.stop_memory(),
+    }
+
+    def do_GET(self):
+        route = self.routes.get(self.path.split("?")[0])
+        if route is None:
+            self.send_error(404)
+            return
+        body = route().encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+def start_metrics_server(host=METRICS_HOST, port=METRICS_PORT):
+    """Serves /metrics and the /profile toggles from a daemon thread."""
+    try:
+        server = ThreadingHTTPServer((host, port), _MetricsHandler)
+    except OSError as e:
+        print(f"Metrics Server Error: {e}")
+        return None
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    print(f"📊 Metrics on http://{host}:{port}/metrics")
+    return server
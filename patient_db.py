@@ -1,6 +1,9 @@
 import pandas as pd
 import random
 
+# Shared seed so the dashboard and the simulators agree on each bed's condition
+WARD_SEED = 2024
+
 # Embedded EWS Logic (so this file runs standalone)
 def calculate_news_internal(hr, spo2, sys_bp, temp, rr):
     score = 0
@@ -20,28 +23,29 @@ def calculate_news_internal(hr, spo2, sys_bp, temp, rr):
     elif temp >= 39.1: score += 2
     return score
 
-def generate_patient_db(n=50):
+def generate_patient_db(n=50, seed=None):
+    rng = random.Random(seed)
     first_names = ["Arjun", "Aditi", "Rahul", "Priya", "Amit", "Sneha", "Vikram", "Anjali", "Rohan", "Kavita"]
     last_names = ["Sharma", "Verma", "Gupta", "Singh", "Patel", "Das", "Rao", "Nair", "Mehta", "Kumar"]
-    conditions = ["Post-Op Recovery", "Dengue Fever", "Hypertension", "Viral Fever", "Cardiac Obs", "Stable", "Respiratory Infection"]
+    conditions = ["Post-Op Recovery", "Dengue Fever", "Hypertension", "Viral Fever", "Cardiac Obs", "Stable", "Respiratory Infection", "Sepsis"]
     
     rows = []
     for i in range(1, n + 1):
         bed_id = f"BED-{i:03d}"
         # Generate random vitals for the baseline
-        hr = random.randint(60, 100)
-        spo2 = random.randint(90, 100)
-        sys = random.randint(100, 140)
-        temp = round(random.uniform(36.5, 37.5), 1)
-        rr = random.randint(12, 20)
+        hr = rng.randint(60, 100)
+        spo2 = rng.randint(90, 100)
+        sys = rng.randint(100, 140)
+        temp = round(rng.uniform(36.5, 37.5), 1)
+        rr = rng.randint(12, 20)
         
         score = calculate_news_internal(hr, spo2, sys, temp, rr)
         
         rows.append({
             "Bed ID": bed_id,
-            "Name": f"{random.choice(first_names)} {random.choice(last_names)}",
-            "Age": random.randint(20, 80),
-            "Condition": random.choice(conditions),
+            "Name": f"{rng.choice(first_names)} {rng.choice(last_names)}",
+            "Age": rng.randint(20, 80),
+            "Condition": rng.choice(conditions),
             "Baseline NEWS": score
         })
 
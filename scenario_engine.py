@@ -0,0 +1,216 @@
+import time
+import numpy as np
+
+# --- VITAL LAYOUT ---
+# Every bed is one row of the state matrix; columns follow this order.
+VITALS = ("hr", "rr", "bp_sys", "bp_dia", "spo2", "temp")
+HR, RR, SYS, DIA, SPO2, TEMP = range(len(VITALS))
+
+BASELINE = np.array([75.0, 16.0, 120.0, 78.0, 98.0, 36.9])
+SPREAD = np.array([8.0, 2.0, 8.0, 5.0, 1.0, 0.2])     # Bed-to-bed baseline variation
+NOISE = np.array([1.2, 0.4, 1.5, 1.0, 0.3, 0.03])     # Beat-to-beat noise (per sqrt second)
+LOWER = np.array([30.0, 6.0, 50.0, 30.0, 70.0, 33.0])
+UPPER = np.array([200.0, 50.0, 200.0, 130.0, 100.0, 41.5])   # Kept inside the God Mode slider ranges
+PULSE_LOWER, PULSE_UPPER = 30.0, 200.0
+
+# Residual correlation of the noise: HR/RR rise together, SBP/DBP move together,
+# SpO2 dips when HR and RR climb.
+CORRELATION = np.array([
+    #  HR    RR    SYS   DIA   SPO2  TEMP
+    [ 1.0,  0.4, -0.2, -0.1, -0.3,  0.3],
+    [ 0.4,  1.0, -0.1,  0.0, -0.4,  0.2],
+    [-0.2, -0.1,  1.0,  0.7,  0.1,  0.0],
+    [-0.1,  0.0,  0.7,  1.0,  0.05, 0.0],
+    [-0.3, -0.4,  0.1,  0.05, 1.0, -0.1],
+    [ 0.3,  0.2,  0.0,  0.0, -0.1,  1.0],
+])
+CHOLESKY = np.linalg.cholesky(CORRELATION)
+
+REVERSION = 0.15          # Pull toward the scenario target per second
+FEVER_HR = 10.0           # bpm of tachycardia per degree above 37 C
+HYPOXIA_RR = 0.6          # breaths/min per SpO2 point below 94
+RECOVERY_RATE = 0.02      # Severity lost per second once an episode resolves
+CRITICAL_SEVERITY = 0.75  # Reported as status "CRITICAL" from here
+
+# --- SCENARIOS ---
+class Scenario:
+    """Condition-specific trajectory.
+
+    `effect` is the shift of each vital at full severity, `offset` a chronic
+    shift that is always present. A stable bed starts an episode with
+    probability `onset` per second, severity then climbs by `progression`
+    per second until the episode resolves (probability `resolve` per second).
+    """
+
+    def __init__(self, effect=None, offset=None, onset=0.0, progression=0.0, resolve=0.0, pulse_deficit=0.0):
+        self.effect = np.array([(effect or {}).get(v, 0.0) for v in VITALS])
+        self.offset = np.array([(offset or {}).get(v, 0.0) for v in VITALS])
+        self.onset = onset
+        self.progression = progression
+        self.resolve = resolve
+        self.pulse_deficit = pulse_deficit
+
+SCENARIOS = {
+    "Stable": Scenario(),
+    "Sepsis": Scenario(
+        effect={"hr": 45, "rr": 12, "bp_sys": -40, "bp_dia": -25, "spo2": -6, "temp": 2.0},
+        onset=0.0003, progression=0.004, resolve=0.002),
+    "Post-Op Recovery": Scenario(   # Post-op bleed: compensatory tachycardia, then BP falls
+        effect={"hr": 50, "rr": 8, "bp_sys": -50, "bp_dia": -30, "spo2": -3, "temp": -0.6},
+        onset=0.0001, progression=0.01, resolve=0.004),
+    "Dengue Fever": Scenario(       # Dengue shock: plasma leak narrows the pulse pressure
+        effect={"hr": 40, "rr": 6, "bp_sys": -30, "bp_dia": -5, "spo2": -3, "temp": 1.5},
+        offset={"temp": 1.0}, onset=0.0002, progression=0.005, resolve=0.003),
+    "Respiratory Infection": Scenario(
+        effect={"hr": 20, "rr": 14, "spo2": -10, "temp": 1.2},
+        onset=0.0002, progression=0.006, resolve=0.003),
+    "Viral Fever": Scenario(
+        effect={"rr": 4, "temp": 1.8}, offset={"temp": 0.5},
+        onset=0.0002, progression=0.01, resolve=0.005),
+    "Cardiac Obs": Scenario(        # Fast AF: irregular, pulse lags the ECG rate
+        effect={"hr": 55, "bp_sys": -20, "bp_dia": -10, "spo2": -3},
+        onset=0.0002, progression=0.02, resolve=0.01, pulse_deficit=20),
+    "Hypertension": Scenario(       # Hypertensive crisis on top of a raised baseline
+        effect={"hr": 10, "bp_sys": 60, "bp_dia": 30}, offset={"bp_sys": 25, "bp_dia": 12},
+        onset=0.0001, progression=0.01, resolve=0.005),
+}
+
+def register_scenario(condition, scenario):
+    """Adds or replaces the trajectory used for a patient_db condition."""
+    SCENARIOS[condition] = scenario
+
+# --- WARD MODEL ---
+class WardModel:
+    """Simulates every bed of a ward at once with array math."""
+
+    def __init__(self, bed_ids, conditions, seed=None):
+        self.bed_ids = list(bed_ids)
+        self.rng = np.random.default_rng(seed)
+        n = len(self.bed_ids)
+
+        # Scenario parameters are gathered once into per-bed arrays
+        names = [c if c in SCENARIOS else "Stable" for c in conditions]
+        table = [SCENARIOS[c] for c in names]
+        self.conditions = names
+        self.effect = np.array([s.effect for s in table]).reshape(n, len(VITALS))
+        self.onset = np.array([s.onset for s in table])
+        self.progression = np.array([s.progression for s in table])
+        self.resolve = np.array([s.resolve for s in table])
+        self.pulse_deficit = np.array([s.pulse_deficit for s in table])
+
+        offset = np.array([s.offset for s in table]).reshape(n, len(VITALS))
+        self.baseline = BASELINE + offset + self.rng.standard_normal((n, len(VITALS))) * SPREAD
+        self.values = self.baseline.copy()
+        self.pulse = self.values[:, HR] - self.rng.uniform(0, 3, n)
+
+        self.severity = np.zeros(n)
+        self.deteriorating = np.zeros(n, dtype=bool)
+        self.fluid = self.rng.uniform(50, 100, n)
+        self.flow_rate = self.rng.uniform(0.4, 0.7, n)   # SLOW Saline Flow (3 mins to drain)
+        self.nurse_call = np.zeros(n, dtype=bool)
+        self.manual_mode = np.zeros(n, dtype=bool)
+
+        self.index = {bid: i for i, bid in enumerate(self.bed_ids)}
+
+    def step(self, dt=1.0):
+        """Advances every bed by `dt` seconds."""
+        n = len(self.bed_ids)
+        rng = self.rng
+
+        # 1. FLUID LOGIC
+        self.fluid -= self.flow_rate * dt
+        self.fluid[self.fluid <= 0] = 100
+
+        # 2. EPISODES START / RESOLVE (nurse call pauses new episodes, manual beds are frozen)
+        auto = ~self.manual_mode
+        start = auto & ~self.deteriorating & ~self.nurse_call & (rng.random(n) < self.onset * dt)
+        resolve = auto & self.deteriorating & (rng.random(n) < self.resolve * dt)
+        self.deteriorating = (self.deteriorating | start) & ~resolve
+        rate = np.where(self.deteriorating, self.progression, -RECOVERY_RATE)
+        self.severity = np.clip(self.severity + np.where(auto, rate, 0.0) * dt, 0.0, 1.0)
+
+        # 3. TARGET VITALS FROM SEVERITY + PHYSIOLOGICAL COUPLING
+        x = self.values
+        target = self.baseline + self.severity[:, None] * self.effect
+        target[:, HR] += FEVER_HR * np.clip(x[:, TEMP] - 37.0, 0, None)
+        target[:, RR] += HYPOXIA_RR * np.clip(94.0 - x[:, SPO2], 0, None)
+
+        # 4. MEAN-REVERTING DRIFT WITH CORRELATED NOISE (manual beds are held)
+        noise = rng.standard_normal((n, len(VITALS))) @ CHOLESKY.T * NOISE * np.sqrt(dt)
+        drift = REVERSION * (target - x) * dt + noise
+        x[auto] = np.clip(x[auto] + drift[auto], LOWER, UPPER)
+
+        # 5. PULSE FOLLOWS HR (irregular rhythms open a pulse deficit)
+        deficit = rng.uniform(0, 3, n) + self.severity * self.pulse_deficit * rng.random(n)
+        self.pulse[auto] = np.clip(x[auto, HR] - deficit[auto], PULSE_LOWER, PULSE_UPPER)
+
+    def statuses(self):
+        # Manual beds report what God Mode sets, never a hidden episode
+        critical = (self.severity >= CRITICAL_SEVERITY) & ~self.manual_mode
+        return np.where(self.nurse_call, "NURSE CALL", np.where(critical, "CRITICAL", "NORMAL"))
+
+    def payloads(self):
+        """One MQTT payload per bed, in the same shape the dashboard expects."""
+        x = np.rint(self.values[:, :SPO2 + 1]).astype(int).tolist()
+        temps = np.round(self.values[:, TEMP], 1).tolist()
+        pulses = np.rint(self.pulse).astype(int).tolist()
+        fluids = self.fluid.astype(int).tolist()
+        statuses = self.statuses().tolist()
+        nurse = self.nurse_call.tolist()
+        now = time.time()
+        return [{
+            "id": bid,
+            "hr": x[i][HR],
+            "pulse": pulses[i],
+            "rr": x[i][RR],
+            "spo2": x[i][SPO2],
+            "bp": f"{x[i][SYS]}/{x[i][DIA]}",
+            "temp": temps[i],
+            "fluid": fluids[i],
+            "status": statuses[i],
+            "nurse_call": nurse[i],
+            "timestamp": now,
+        } for i, bid in enumerate(self.bed_ids)]
+
+    def beds(self):
+        return {bid: BedView(self, bid) for bid in self.bed_ids}
+
+# --- PER-BED VIEW ---
+class BedView:
+    """Attribute access to one row of a WardModel.
+
+    Lets the God Mode sliders and the control-channel applier keep writing
+    `bed.hr = ...` while the state itself stays in the shared arrays.
+    """
+
+    __slots__ = ("model", "bed_id", "i")
+
+    def __init__(self, model, bed_id):
+        object.__setattr__(self, "model", model)
+        object.__setattr__(self, "bed_id", bed_id)
+        object.__setattr__(self, "i", model.index[bed_id])
+
+    def __getattr__(self, name):
+        m, i = self.model, self.i
+        if name in VITALS:
+            return float(m.values[i, VITALS.index(name)])
+        if name in ("pulse", "fluid"):
+            return float(getattr(m, name)[i])
+        if name in ("nurse_call", "manual_mode"):
+            return bool(getattr(m, name)[i])
+        if name == "status":
+            if m.nurse_call[i]: return "NURSE CALL"
+            critical = m.severity[i] >= CRITICAL_SEVERITY and not m.manual_mode[i]
+            return "CRITICAL" if critical else "NORMAL"
+        if name == "condition":
+            return m.conditions[i]
+        raise AttributeError(name)
+
+    def __setattr__(self, name, value):
+        m, i = self.model, self.i
+        if name in VITALS:
+            m.values[i, VITALS.index(name)] = value
+        elif name in ("pulse", "fluid", "nurse_call", "manual_mode"):
+            getattr(m, name)[i] = value
+        else:
+            raise AttributeError(name)